@@ -0,0 +1,54 @@
+
+// Clientside callbacks, these run in the browser without a round trip to the server
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+
+    outliers: {
+
+        // Rounds a slider bound to a number of digits that suits the width of the range, as format_float does on the server
+        format_bound: function(range, point) {
+
+            var width = Math.abs(range[1] - range[0]);
+            var digits = width > 0 ? Math.max(Math.ceil(Math.log10(1/width) + 3), 0) : 0;
+
+            return String(Number(point.toFixed(Math.min(digits, 20))));
+        },
+
+        // Adds the four bound lines to the figure of the last fit and writes the slider readouts.
+        // While a slider is dragged its drag value is used, otherwise the released value
+        draw_bounds: function(fit_figure, x_drag, y_drag, x_value, y_value) {
+
+            var no_update = window.dash_clientside.no_update;
+
+            var triggered = (window.dash_clientside.callback_context.triggered || []).map(function(t) { return t.prop_id; });
+            var x = (triggered.indexOf('x-slider.drag_value') >= 0 && x_drag) ? x_drag : x_value;
+            var y = (triggered.indexOf('y-slider.drag_value') >= 0 && y_drag) ? y_drag : y_value;
+
+            var format_bound = window.dash_clientside.outliers.format_bound;
+            var x_reading = format_bound(x, x[0]) + ' to ' + format_bound(x, x[1]);
+
+            if (!fit_figure) {
+                return [no_update, x_reading, format_bound(y, y[1]), format_bound(y, y[0])];
+            }
+
+            var extent = fit_figure.extent;
+            var line = {color: 'Crimson', width: 1, dash: 'dashdot'};
+            var bound = function(x0, y0, x1, y1) {
+                return {type: 'line', x0: x0, y0: y0, x1: x1, y1: y1, opacity: 0.33, line: line};
+            };
+
+            var figure = {
+                data: fit_figure.figure.data,
+                layout: Object.assign({}, fit_figure.figure.layout, {
+                    shapes: [
+                        bound(x[0], extent[2], x[0], extent[3]),
+                        bound(x[1], extent[2], x[1], extent[3]),
+                        bound(extent[0], y[0], extent[1], y[0]),
+                        bound(extent[0], y[1], extent[1], y[1])
+                    ]
+                })
+            };
+
+            return [figure, x_reading, format_bound(y, y[1]), format_bound(y, y[0])];
+        }
+    }
+});
@@ -5,16 +5,12 @@ setTimeout(function(){
 
     mydownload.on("click", function() {
 
-        var inliers_csv = d3.select("#uploaded-inliers-csv").text();
+        // The button link saves the inliers, save the outliers from the hidden link next to it
+        var outliers = document.getElementById("download-outliers");
 
-        download(inliers_csv, "inliers.csv", "text/csv");
-
-        var outliers_csv = d3.select("#uploaded-outliers-csv").text();
-
-        download(outliers_csv, "outliers.csv", "text/csv");
+        setTimeout(function(){ outliers.click(); }, 500);
 
     })
 
 }, 3000);
 
-
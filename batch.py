@@ -0,0 +1,172 @@
+import argparse
+import collections
+import concurrent.futures
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import app
+
+# File types read by the batch mode, the same as the web upload accepts
+batch_extensions = ('.csv', '.xls', '.xlsx')
+
+# This function accepts a list of directories, files and glob patterns.
+# It returns the sorted list of data files they name, directories contribute every data file directly inside them
+def find_files(inputs):
+
+    files = set()
+    for pattern in inputs:
+
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+
+        for path in glob.glob(pattern):
+            if os.path.isfile(path) and path.lower().endswith(batch_extensions):
+                files.add(path)
+
+    return sorted(files)
+
+# This function accepts the list of data files and returns a unique output file stem for each. The stem is the file name without its extension,
+# files that share a name use their path relative to the common directory of the files instead, and a counter settles any remaining clash
+def output_stems(files):
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in files]
+    shared = collections.Counter(names)
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+
+    stems = []
+    used = set()
+    for (path, name) in zip(files, names):
+
+        stem = name
+        if shared[name] > 1:
+            stem = os.path.splitext(os.path.relpath(os.path.abspath(path), common))[0].replace(os.sep, '_')
+
+        candidate = stem
+        count = 1
+        while candidate in used:
+            count += 1
+            candidate = '{}_{}'.format(stem, count)
+
+        used.add(candidate)
+        stems.append(candidate)
+
+    return stems
+
+# This function accepts the path of a bounds file, a CSV with the columns file, x_min, x_max, y_min and y_max.
+# It returns a dictionary from file name to the x and y bounds of that file
+def read_bounds(path):
+
+    bounds = {}
+    for row in pd.read_csv(path).itertuples(index=False):
+        bounds[os.path.basename(row.file)] = ([row.x_min, row.x_max], [row.y_min, row.y_max])
+
+    return bounds
+
+# This function accepts the path of a data file, its output file stem, the model, the robust mode, the x and y bounds, the output directory and the export format.
+# It fits the file as the web app does, writes the inliers and outliers next to each other in the output directory and returns a summary row
+def process_file(path, stem, model, robust, x_value_list, y_value_list, output_dir, file_format):
+
+    started = time.time()
+    name = os.path.basename(path)
+    summary = {'file': path, 'output': stem, 'rows': 0}
+
+    try:
+        with open(path, 'rb') as f:
+            (df, width) = app.read_upload(f.read(), name)
+
+        x_data = df.iloc[:, 0].values
+        y_data = df.iloc[:, 1].values
+
+        ranking = []
+        fit_select = model
+        if model == 'auto':
+            inlier_mask = app.outlier_fx(x_data, y_data, x_value_list, y_value_list)
+            ranking = app.rank_models(x_data[inlier_mask], y_data[inlier_mask])
+            fit_select = ranking[0]['model'] if ranking else 'linear'
+
+        (x_fit, y_fit, fit_equation, inlier_mask, popt, pcov) = app.my_fx(x_data, y_data, fit_select, x_value_list, y_value_list, robust=robust)
+
+        for (part, mask) in [('inliers', inlier_mask), ('outliers', ~inlier_mask)]:
+            with open(os.path.join(output_dir, '{}_{}.{}'.format(stem, part, file_format)), 'wb') as f:
+                for data in app.export_chunks(x_data, y_data, mask, file_format):
+                    f.write(data)
+
+        inlier_count = int(np.count_nonzero(inlier_mask))
+        summary.update({
+            'rows': len(x_data),
+            'model': fit_select,
+            'equation': fit_equation,
+            'parameters': ' '.join('{:.6e}'.format(p) for p in popt),
+            'errors': ' '.join('{:.6e}'.format(e) for e in np.sqrt(np.abs(np.diag(pcov)))),
+            'inlier_count': inlier_count,
+            'outlier_count': len(inlier_mask) - inlier_count
+            })
+
+    except Exception as e:
+        summary['error'] = '{}: {}'.format(type(e).__name__, e)
+
+    summary['seconds'] = time.time() - started
+
+    return summary
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Fit every CSV/Excel file in a directory or glob and save the clean data and a summary table.')
+    parser.add_argument('inputs', nargs='+', help='directories, files or glob patterns of the data files')
+    parser.add_argument('--model', default='linear', choices=list(app.model_labels) + ['auto'], help='fit model (default linear)')
+    parser.add_argument('--robust', choices=list(app.robust_names), help='also find outliers inside the bounds with a robust fit')
+    parser.add_argument('--x-bounds', nargs=2, type=float, default=[-np.inf, np.inf], metavar=('LOW', 'HIGH'), help='x bounds of every file')
+    parser.add_argument('--y-bounds', nargs=2, type=float, default=[-np.inf, np.inf], metavar=('LOW', 'HIGH'), help='y bounds of every file')
+    parser.add_argument('--bounds-file', help='CSV with the columns file, x_min, x_max, y_min and y_max, overrides the bounds of the files it lists')
+    parser.add_argument('--output', default='batch_output', help='directory of the clean data and summary.csv (default batch_output)')
+    parser.add_argument('--format', default='csv', choices=list(app.export_formats), help='format of the clean data files (default csv)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    parser.add_argument('--window', type=int, help='most files loaded at once, bounds memory use (default twice the workers)')
+    args = parser.parse_args()
+
+    files = find_files(args.inputs)
+    if not files:
+        parser.error('no data files found')
+
+    bounds = read_bounds(args.bounds_file) if args.bounds_file else {}
+    window = args.window or 2*args.workers
+
+    os.makedirs(args.output, exist_ok=True)
+
+    started = time.time()
+    summaries = []
+
+    # Files are submitted as earlier ones finish, so at most {window} files are held in memory at once
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+
+        pending = set()
+        for (path, stem) in zip(files, output_stems(files)):
+
+            (x_value_list, y_value_list) = bounds.get(os.path.basename(path), (args.x_bounds, args.y_bounds))
+            pending.add(pool.submit(process_file, path, stem, args.model, args.robust, x_value_list, y_value_list, args.output, args.format))
+
+            if len(pending) >= window:
+                (done, pending) = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                summaries += [future.result() for future in done]
+
+        summaries += [future.result() for future in concurrent.futures.as_completed(pending)]
+
+    elapsed = time.time() - started
+
+    columns = ['file', 'output', 'rows', 'model', 'equation', 'parameters', 'errors', 'inlier_count', 'outlier_count', 'seconds', 'error']
+    summary = pd.DataFrame(summaries).reindex(columns=columns).sort_values('file')
+    summary[['inlier_count', 'outlier_count']] = summary[['inlier_count', 'outlier_count']].astype('Int64')
+    summary.to_csv(os.path.join(args.output, 'summary.csv'), index=False)
+
+    rows = int(summary['rows'].sum())
+    failed = int(summary['error'].notna().sum())
+
+    print('Fitted {:,} files ({:,} failed) with {:,} rows in {:.2f}s: {:.1f} files/s, {:,.0f} rows/s'.format(
+        len(files), failed, rows, elapsed, len(files)/elapsed, rows/elapsed))
+
+if __name__ == '__main__':
+    main()
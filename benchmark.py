@@ -0,0 +1,184 @@
+import argparse
+import base64
+import gc
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import app
+
+# Stages slower than the baseline by more than this factor are reported as regressions
+benchmark_tolerance = 1.25
+
+# This function accepts a number of rows, the fraction of outliers and a seed.
+# It returns a dataframe of a noisy line with that fraction of points scattered far from the line, and x/y bounds that exclude most of them
+def synthetic_data(rows, outlier_fraction, seed=0):
+
+    rng = np.random.default_rng(seed)
+
+    x_data = rng.uniform(0, 100, rows)
+    y_data = 2*x_data + 10 + rng.normal(0, 5, rows)
+
+    outliers = rng.random(rows) < outlier_fraction
+    y_data[outliers] = rng.uniform(-500, 700, np.count_nonzero(outliers))
+
+    df = pd.DataFrame({'x': x_data, 'y': y_data})
+
+    return df, [5.0, 95.0], [-20.0, 230.0]
+
+# This function accepts a function and the number of times to run it.
+# It returns the fastest run time in seconds, and the peak memory in bytes of a separate run traced with tracemalloc
+def measure(stage, repeat):
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - started)
+
+    # Tracing slows allocations down, so memory is measured on its own run
+    gc.collect()
+    tracemalloc.start()
+    stage()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(times), peak
+
+# This function accepts a dataframe, its bounds, the models to fit and a directory for the dataset store.
+# It returns a list of (stage name, function) pairs covering the upload, column view, bounds, fit and figure paths of the app
+def benchmark_stages(df, x_value_list, y_value_list, models, store_directory):
+
+    content = df.to_csv(index=False).encode()
+    contents = 'data:text/csv;base64,' + base64.b64encode(content).decode()
+    x_data = df['x'].values
+    y_data = df['y'].values
+
+    # Each run stores the upload in a new directory, the store would otherwise find the columns of the last run
+    def upload():
+        directory = tempfile.mkdtemp()
+        try:
+            app.DatasetStore(directory, app.dataset_store_bytes).put(content, 'benchmark.csv')
+        finally:
+            shutil.rmtree(directory)
+
+    # The upload callback path decodes the browser's base64 contents and stores them in the app's dataset store, a new one for each run
+    def parse_upload():
+        directory = tempfile.mkdtemp()
+        (dataset_store, app.dataset_store) = (app.dataset_store, app.DatasetStore(directory, app.dataset_store_bytes))
+        try:
+            app.parse_contents(contents, 'benchmark.csv', 0)
+        finally:
+            app.dataset_store = dataset_store
+            shutil.rmtree(directory)
+
+    def column_view():
+        dataset = store.get(key)
+        (dataset['stats'], dataset['views']) = ({}, {})
+        dataset['nbytes'] = sum(array.nbytes for array in dataset['arrays'])
+        store.view(dataset, 0, 1)
+
+    store = app.DatasetStore(store_directory, app.dataset_store_bytes)
+    key = store.put(content, 'benchmark.csv')
+    dataset = store.view(store.get(key), 0, 1)
+
+    # The x bounds move by one percent of their range between runs, the index then reclassifies the points in between
+    # rather than returning the mask of the last bounds
+    x_step = 0.01*(x_value_list[1] - x_value_list[0])
+    x_bounds = itertools.cycle([[x_value_list[0] + x_step, x_value_list[1] - x_step], x_value_list])
+
+    # Every run starts from an empty fit cache so that fits are measured rather than cache hits
+    def cold(fit):
+        def stage():
+            app.fit_cache = app.LRUCache(app.fit_cache_bytes)
+            fit()
+        return stage
+
+    stages = [
+        ('parse_contents', parse_upload),
+        ('dataset_store put', upload),
+        ('dataset_store view', column_view),
+        ('outlier_fx', lambda: app.outlier_fx(x_data, y_data, x_value_list, y_value_list)),
+        ('bounds_index', lambda: dataset['index'].inliers(next(x_bounds), y_value_list)),
+        ('curve_sample', lambda: app.curve_sample(app.cubic, (1e-4, -1e-2, 2, 10), 0, 100, app.default_fit_budget))
+    ]
+
+    for model in models:
+        stages.append(('my_fx ' + model, lambda model=model: app.my_fx(x_data, y_data, model, x_value_list, y_value_list)))
+
+    stages += [
+        ('new_graph', cold(lambda: app.new_graph(dataset, 'linear', x_value_list, y_value_list))),
+        ('new_graph cached', lambda: app.new_graph(dataset, 'linear', x_value_list, y_value_list))
+    ]
+
+    return stages
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Time the upload, fit and figure stages of the app on synthetic data and compare them with a baseline.')
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5, 1e6], help='numbers of rows (up to 1e7)')
+    parser.add_argument('--outliers', nargs='+', type=float, default=[0.0, 0.1, 0.3], help='fractions of outliers')
+    parser.add_argument('--models', nargs='+', default=list(app.model_labels), choices=list(app.model_labels), help='models fitted by my_fx')
+    parser.add_argument('--stages', nargs='+', help='only run stages whose name starts with one of these')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest is reported')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='baseline file compared against')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    store_directory = tempfile.mkdtemp()
+
+    print('{:<22}{:>10}{:>10}{:>12}{:>12}{:>10}'.format('stage', 'rows', 'outliers', 'seconds', 'peak MB', 'baseline'))
+
+    for rows in [int(size) for size in args.sizes]:
+        for outlier_fraction in args.outliers:
+
+            (df, x_value_list, y_value_list) = synthetic_data(rows, outlier_fraction)
+
+            for (name, stage) in benchmark_stages(df, x_value_list, y_value_list, args.models, store_directory):
+
+                if args.stages and not any(name.startswith(prefix) for prefix in args.stages):
+                    continue
+
+                (seconds, peak) = measure(stage, args.repeat)
+
+                key = '{}|{}|{}'.format(name, rows, outlier_fraction)
+                results[key] = {'seconds': seconds, 'peak_bytes': peak}
+
+                ratio = ''
+                if key in baseline:
+                    ratio = seconds/baseline[key]['seconds']
+                    if ratio > benchmark_tolerance:
+                        regressions.append(key)
+                    ratio = '{:.2f}x'.format(ratio)
+
+                print('{:<22}{:>10,}{:>10.2f}{:>12.4f}{:>12.1f}{:>10}'.format(name, rows, outlier_fraction, seconds, peak/1e6, ratio))
+
+    shutil.rmtree(store_directory)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+
+    if regressions:
+        print('Slower than the baseline by more than {:.0%}:'.format(benchmark_tolerance - 1))
+        for key in regressions:
+            print('  ' + key)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The tests import app.py from the repository root, with its dataset store in a directory of their own
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OUTLIERS_DATASET_DIR', tempfile.mkdtemp(prefix='outliers_test_'))
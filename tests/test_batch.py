@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import batch
+
+def test_output_stems_are_unique():
+
+    files = [os.path.join('in', 'a', 'data.csv'), os.path.join('in', 'b', 'data.csv'), os.path.join('in', 'data.xlsx'), os.path.join('in', 'other.csv')]
+
+    stems = batch.output_stems(files)
+
+    assert len(set(stems)) == len(files)
+    assert stems[-1] == 'other'
+
+def test_runs_from_any_working_directory(tmp_path):
+
+    (tmp_path / 'in').mkdir()
+    (tmp_path / 'in' / 'data.csv').write_text('x,y\n1,2\n2,4\n3,6\n4,8\n')
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'batch.py')
+
+    subprocess.run([sys.executable, script, 'in', '--output', 'out', '--workers', '1'], cwd=str(tmp_path), check=True, timeout=120)
+
+    assert (tmp_path / 'out' / 'summary.csv').exists()
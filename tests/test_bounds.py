@@ -0,0 +1,39 @@
+import numpy as np
+
+import app
+
+def test_incremental_inliers_match_a_full_classification():
+
+    rng = np.random.RandomState(1)
+    x_data = rng.randint(0, 200, 2000).astype(float)
+    y_data = rng.normal(0, 10, 2000)
+    x_data[::97] = np.nan
+    y_data[::89] = np.nan
+
+    index = app.BoundsIndex(x_data, y_data)
+    x_value_list = [0, 200]
+    y_value_list = [-40, 40]
+
+    # Small moves are applied incrementally and large jumps with a full pass, both must agree with outlier_fx
+    for step in range(300):
+        if step % 25 == 0:
+            x_value_list = sorted(rng.uniform(-10, 210, 2))
+            y_value_list = sorted(rng.uniform(-50, 50, 2))
+        else:
+            x_value_list = sorted([x_value_list[0] + rng.randint(-3, 4), x_value_list[1] + rng.randint(-3, 4)])
+            y_value_list = sorted([y_value_list[0] + rng.uniform(-0.5, 0.5), y_value_list[1] + rng.uniform(-0.5, 0.5)])
+
+        inlier_mask = index.inliers(x_value_list, y_value_list)
+        expected = app.outlier_fx(x_data, y_data, x_value_list, y_value_list)
+
+        assert np.array_equal(inlier_mask, expected)
+        assert index.inlier_count == np.count_nonzero(expected)
+
+def test_returned_mask_is_a_copy():
+
+    index = app.BoundsIndex(np.arange(10.0), np.arange(10.0))
+
+    inlier_mask = index.inliers([2, 7], [0, 9])
+    inlier_mask[:] = False
+
+    assert np.count_nonzero(index.inliers([2, 7], [0, 9])) == 6
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import app
+
+@pytest.fixture
+def power_data():
+
+    rng = np.random.RandomState(1)
+    x_data = rng.uniform(1, 100, 5000)
+    y_data = 3*x_data**1.7 - 50 + rng.normal(0, 20, len(x_data))
+
+    return x_data, y_data
+
+@pytest.fixture
+def slow_power(monkeypatch):
+
+    power = app.power
+
+    def slow(x, a, n, b):
+        time.sleep(0.02)
+        return power(x, a, n, b)
+
+    monkeypatch.setitem(app.model_functions, 'power', slow)
+
+@pytest.fixture
+def dataset(power_data, tmp_path):
+
+    (x_data, y_data) = power_data
+    store = app.DatasetStore(str(tmp_path), app.dataset_store_bytes)
+    content = '\n'.join(['x,y'] + ['{},{}'.format(x, y) for (x, y) in zip(x_data, y_data)]).encode()
+
+    return store.view(store.get(store.put(content, 'power.csv')), 0, 1)
+
+def test_evaluation_budget_returns_the_best_parameters_so_far(power_data):
+
+    (x_data, y_data) = power_data
+    deadline = app.FitDeadline(max_evaluations=3)
+
+    (popt, pcov) = app.my_fx(x_data, y_data, 'power', [0, 101], [-1e9, 1e9], deadline=deadline)[4:]
+
+    assert deadline.timed_out
+    assert np.all(np.isfinite(popt))
+    assert np.all(np.isinf(pcov))
+
+def test_time_budget_stops_a_slow_fit(power_data, slow_power):
+
+    (x_data, y_data) = power_data
+    started = time.monotonic()
+
+    fit_equation = app.my_fx(x_data, y_data, 'power', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline(seconds=0.2))[2]
+
+    assert time.monotonic() - started < 2
+    assert 'fit timed out' in fit_equation
+
+def test_newer_request_of_the_session_cancels_the_fit(dataset, slow_power, monkeypatch):
+
+    monkeypatch.setattr(app, 'fit_cache', app.LRUCache(app.fit_cache_bytes))
+    session = 'ab12'
+    outcome = {}
+
+    def older():
+        try:
+            app.cached_fit(dataset, 'power', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline(session=session))
+            outcome['older'] = 'finished'
+        except app.FitCancelled:
+            outcome['older'] = 'cancelled'
+
+    thread = threading.Thread(target=older)
+    thread.start()
+    time.sleep(0.2)
+
+    app.cached_fit(dataset, 'linear', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline(session=session))
+    thread.join(10)
+
+    assert outcome == {'older': 'cancelled'}
+
+def test_requests_claiming_the_same_fit_share_it(dataset, slow_power, monkeypatch):
+
+    monkeypatch.setattr(app, 'fit_cache', app.LRUCache(app.fit_cache_bytes))
+    fits = []
+    make_fit = app.make_fit
+    monkeypatch.setattr(app, 'make_fit', lambda *args: fits.append(args) or make_fit(*args))
+
+    session = 'cd34'
+    results = []
+
+    def request():
+        results.append(app.cached_fit(dataset, 'power', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline(session=session)))
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert len(results) == 2
+    assert len(fits) == 1
+    assert results[0]['popt'] is results[1]['popt']
+
+def test_timed_out_fits_are_not_cached(dataset, monkeypatch):
+
+    monkeypatch.setattr(app, 'fit_cache', app.LRUCache(app.fit_cache_bytes))
+
+    truncated = app.cached_fit(dataset, 'power', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline(max_evaluations=3))
+    refitted = app.cached_fit(dataset, 'power', [0, 101], [-1e9, 1e9], deadline=app.FitDeadline())
+
+    assert truncated['timed_out']
+    assert not refitted['timed_out']
+    assert 'fit timed out' not in refitted['equation']
+    assert np.all(np.isfinite(refitted['pcov']))
+    assert np.allclose(refitted['popt'], [3, 1.7, -50], rtol=0.1, atol=10)
+
+def test_timed_out_models_are_left_out_of_the_ranking(power_data, capsys):
+
+    (x_data, y_data) = power_data
+    deadline = app.FitDeadline(seconds=0)
+
+    ranking = app.rank_models(x_data, y_data, deadline)
+
+    assert deadline.timed_out
+    assert 'power' not in [fit['model'] for fit in ranking]
+    assert 'linear' in [fit['model'] for fit in ranking]
+    assert 'outliers_ranking_failures_total{model="power",reason="timeout"}' in app.metrics.render()
+    assert capsys.readouterr().out == ''
+
+def test_only_a_timeout_of_the_final_fit_marks_the_equation(power_data):
+
+    (x_data, y_data) = power_data
+    deadline = app.FitDeadline(seconds=0)
+
+    app.rank_models(x_data, y_data, deadline)
+    fit_equation = app.my_fx(x_data, y_data, 'linear', [0, 101], [-1e9, 1e9], deadline=deadline)[2]
+
+    assert deadline.timed_out
+    assert 'fit timed out' not in fit_equation
+
+def test_evaluations_are_counted_across_threads():
+
+    deadline = app.FitDeadline(max_evaluations=10**9)
+
+    def evaluate():
+        for _ in range(1000):
+            deadline.check()
+
+    threads = [threading.Thread(target=evaluate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert deadline.evaluations == 8000
+
+def test_invalid_session_ids_are_ignored():
+    assert app.FitDeadline(session='../../etc').session is None
+
+def test_timed_out_fits_do_not_warm_start_or_count(power_data, monkeypatch):
+
+    (x_data, y_data) = power_data
+    monkeypatch.setattr(app, 'warm_starts', app.LRUCache(app.warm_start_bytes))
+    observed = []
+    monkeypatch.setattr(app.metrics, 'observe', lambda *args, **labels: observed.append(args))
+
+    app.fit_model('power', x_data, y_data, session='ef56', deadline=app.FitDeadline(max_evaluations=3), dataset_key='power:x:y')
+
+    assert app.warm_starts.get(('ef56', 'power:x:y', 'power')) is None
+    assert not [args for args in observed if args[0] == 'outliers_fit_evaluations']
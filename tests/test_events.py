@@ -0,0 +1,128 @@
+import datetime
+import os
+import time
+
+import bson
+import pytest
+
+import app
+
+mongomock = pytest.importorskip('mongomock')
+
+# This class stands in for the events collection, it records the size of each insert_many and can be made to fail
+# outright or after writing the first half of a batch
+class Collection(object):
+
+    def __init__(self):
+        self.collection = mongomock.MongoClient().db.events
+        self.batches = []
+        self.failure = None
+
+    def insert_many(self, documents, ordered=True):
+
+        documents = list(documents)
+        self.batches.append(len(documents))
+
+        if self.failure == 'down':
+            raise ConnectionError('database unreachable')
+
+        if self.failure == 'partial':
+            # Give every document its _id as pymongo does before sending, then lose the connection half way through
+            for document in documents:
+                document.setdefault('_id', bson.ObjectId())
+            self.collection.insert_many(documents[:len(documents)//2], ordered=ordered)
+            raise ConnectionError('connection lost')
+
+        return self.collection.insert_many(documents, ordered=ordered)
+
+    def count(self):
+        return self.collection.count_documents({})
+
+def event(number):
+    return {'number': number, 'session_start': datetime.datetime(2020, 1, 1, 12, 0, number % 60)}
+
+@pytest.fixture
+def collection():
+    return Collection()
+
+@pytest.fixture
+def writer(collection, tmp_path):
+    return app.EventWriter(lambda: collection, str(tmp_path/'spill.jsonl'), batch_size=3, flush_seconds=0.05, replay_seconds=0.1)
+
+def test_events_are_written_in_batches(writer, collection):
+
+    for number in range(7):
+        writer.put(event(number))
+    writer.flush()
+
+    assert collection.count() == 7
+    assert max(collection.batches) <= 3
+    assert not os.path.exists(writer.spill_path)
+
+def test_failed_batches_are_spilled_and_replayed_with_their_types(writer, collection):
+
+    collection.failure = 'down'
+    for number in range(4):
+        writer.put(event(number))
+    writer.flush()
+
+    assert collection.count() == 0
+    assert os.path.exists(writer.spill_path)
+
+    collection.failure = None
+    writer.put(event(4))
+    writer.flush()
+
+    assert collection.count() == 5
+    assert not os.path.exists(writer.spill_path)
+    assert all(isinstance(document['session_start'], datetime.datetime) for document in collection.collection.find())
+
+def test_partly_written_batches_are_not_duplicated(writer, collection):
+
+    collection.failure = 'partial'
+    for number in range(3):
+        writer.put(event(number))
+    writer.flush()
+
+    assert collection.count() == 1
+
+    collection.failure = None
+    writer.put(event(3))
+    writer.flush()
+
+    assert sorted(document['number'] for document in collection.collection.find()) == [0, 1, 2, 3]
+    assert not os.path.exists(writer.spill_path)
+
+def test_spilled_events_are_replayed_on_a_timer(writer, collection):
+
+    collection.failure = 'down'
+    writer.put(event(0))
+    writer.flush()
+    collection.failure = None
+
+    waited = 0
+    while os.path.exists(writer.spill_path) and waited < 5:
+        time.sleep(0.05)
+        waited += 0.05
+
+    assert collection.count() == 1
+    assert not os.path.exists(writer.spill_path)
+
+def test_an_outage_is_logged_once(writer, collection, caplog, capsys):
+
+    collection.failure = 'down'
+    for number in range(6):
+        writer.put(event(number))
+    writer.flush()
+    time.sleep(0.3)
+
+    collection.failure = None
+    writer.put(event(6))
+    writer.flush()
+
+    messages = [record.getMessage() for record in caplog.records if record.name == 'outliers.events']
+
+    assert len(messages) == 2
+    assert 'database unreachable' in messages[0]
+    assert messages[1] == 'Session events are written again'
+    assert capsys.readouterr().out == ''
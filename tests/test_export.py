@@ -0,0 +1,80 @@
+import pytest
+
+import app
+
+export_bounds = 'x0=0&x1=100&y0=-1e9&y1=1e9'
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+def export(client, query):
+
+    response = client.get('/export/{}/inliers.csv?{}&{}'.format(app.example['key'], export_bounds, query))
+    response.get_data()
+    response.close()
+
+    return response.status_code
+
+@pytest.mark.parametrize('query', [
+    "robust=huber&fit=print('INJECTED') or (lambda x, a: a*x)",
+    'robust=huber&fit=bogus',
+    'robust=evil',
+    'bands=everything',
+    'budget=-3',
+    'budget=2.5',
+    'budget=many'
+])
+def test_export_rejects_bad_parameters(client, query):
+    assert export(client, query) == 400
+
+@pytest.mark.parametrize('query', [
+    'robust=none&fit=linear&bands=none',
+    'robust=huber&fit=power&budget=300',
+    'robust=tukey&fit=auto&bands=analytic'
+])
+def test_export_accepts_page_parameters(client, query):
+    assert export(client, query) == 200
+
+def test_export_never_evaluates_the_model_name(client, capsys):
+
+    export(client, "robust=huber&fit=print('INJECTED') or linear")
+
+    assert 'INJECTED' not in capsys.readouterr().out
+
+@pytest.mark.parametrize('job', [
+    {'model': 'bogus'},
+    {'model': '__import__("os").getcwd()'},
+    {'robust': 'evil'},
+    {'budget': 0}
+])
+def test_api_rejects_bad_parameters(client, job):
+
+    job.update({'x': [1, 2, 3, 4], 'y': [1, 2, 3, 5]})
+    response = client.post('/api/fit', json=job)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_api_fits_posted_data(client):
+
+    response = client.post('/api/fit', json={'x': [1, 2, 3, 4], 'y': [3, 5, 7, 9], 'model': 'linear', 'mask': False})
+    result = response.get_json()
+
+    assert response.status_code == 200
+    assert result['parameters'] == pytest.approx([2, 1])
+    assert result['inlier_count'] == 4
+
+def test_my_fx_rejects_unknown_models():
+
+    with pytest.raises(ValueError):
+        app.my_fx([1.0, 2.0, 3.0], [1.0, 2.0, 3.0], 'bogus', [0, 9], [0, 9])
+
+def test_metrics_report_the_startup_time(client):
+
+    response = client.get('/metrics')
+    lines = response.get_data(as_text=True).splitlines()
+    response.close()
+
+    assert '# TYPE outliers_startup_seconds gauge' in lines
+    assert float([line for line in lines if line.startswith('outliers_startup_seconds ')][0].split()[1]) > 0
@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+from scipy import optimize
+
+import app
+
+@pytest.fixture
+def line_with_outliers():
+
+    rng = np.random.RandomState(0)
+    x_data = rng.uniform(0, 10, 500)
+    y_data = 2*x_data + 1 + rng.normal(0, 0.1, 500)
+    y_data[::25] += 50
+
+    return x_data, y_data
+
+def test_robust_label_names_the_method_that_ran(line_with_outliers):
+
+    (x_data, y_data) = line_with_outliers
+
+    linear_equation = app.my_fx(x_data, y_data, 'linear', [-1, 11], [-100, 100], robust='ransac')[2]
+    power_equation = app.my_fx(x_data + 1, y_data, 'power', [-1, 12], [-100, 100], robust='ransac')[2]
+
+    assert '(RANSAC, ' in linear_equation
+    assert '(Tukey, ' in power_equation
+
+def test_failed_robust_fit_is_marked_as_a_fallback(capsys):
+
+    # Two points inside the bounds are too few for a cubic, the fit falls back to every point
+    x_data = np.arange(10.0)
+    y_data = x_data**3
+
+    (x_fit, y_fit, fit_equation, inlier_mask) = app.my_fx(x_data, y_data, 'cubic', [-0.5, 1.5], [-1, 1e4], robust='huber')[:4]
+
+    assert 'fit to all points' in fit_equation
+    assert 'Huber' not in fit_equation
+    assert np.count_nonzero(inlier_mask) == 2
+    assert capsys.readouterr().out == ''
+
+def test_toggling_bands_reuses_the_cached_fit(monkeypatch):
+
+    dataset = app.dataset_store.view(app.dataset_store.get(app.example['key']), 0, 1)
+    fits = []
+    my_fx = app.my_fx
+    monkeypatch.setattr(app, 'my_fx', lambda *args: fits.append(args) or my_fx(*args))
+    monkeypatch.setattr(app, 'fit_cache', app.LRUCache(app.fit_cache_bytes))
+
+    plain = app.cached_fit(dataset, 'quadratic', [dataset['x_min'], dataset['x_max']], [dataset['y_min'], dataset['y_max']])
+    banded = app.cached_fit(dataset, 'quadratic', [dataset['x_min'], dataset['x_max']], [dataset['y_min'], dataset['y_max']], bands='analytic')
+
+    assert len(fits) == 1
+    assert plain['bands'] is None
+    assert set(banded['bands']) == {'confidence', 'prediction'}
+    assert np.array_equal(plain['popt'], banded['popt'])
+
+def test_warm_starts_are_kept_per_dataset_view(monkeypatch):
+
+    monkeypatch.setattr(app, 'warm_starts', app.LRUCache(app.warm_start_bytes))
+    x_data = np.linspace(1, 10, 50)
+
+    app.fit_model('power', x_data, 3*x_data**1.5 + 2, session='a1', dataset_key='first:x:y')
+    app.fit_model('power', x_data, 0.5*x_data**-0.5 - 1, session='a1', dataset_key='second:x:y')
+
+    first = app.warm_starts.get(('a1', 'first:x:y', 'power'))
+    second = app.warm_starts.get(('a1', 'second:x:y', 'power'))
+
+    assert np.allclose(first, [3, 1.5, 2], rtol=1e-3)
+    assert np.allclose(second, [0.5, -0.5, -1], rtol=1e-3)
+    assert app.warm_starts.get(('a1', 'power')) is None
+
+@pytest.mark.parametrize('fx', ['linear', 'quadratic', 'cubic', 'fourth', 'root'])
+def test_linear_fit_matches_curve_fit(fx):
+
+    rng = np.random.RandomState(2)
+    x_data = rng.uniform(0.5, 20, 300)
+    params = rng.uniform(-2, 2, app.model_functions[fx].__code__.co_argcount - 1)
+    y_data = app.model_functions[fx](x_data, *params) + rng.normal(0, 0.5, 300)
+    weights = rng.uniform(0.5, 2, 300)
+
+    (popt, pcov) = app.linear_fit(fx, x_data, y_data)
+    (expected_popt, expected_pcov) = optimize.curve_fit(app.model_functions[fx], x_data, y_data, p0=np.ones(len(params)))
+
+    # curve_fit stops iterating short of the exact solution of the higher degree polynomials, the closed form is never worse
+    residual = np.sum((y_data - app.model_functions[fx](x_data, *popt))**2)
+    expected_residual = np.sum((y_data - app.model_functions[fx](x_data, *expected_popt))**2)
+
+    assert residual <= expected_residual*(1 + 1e-12)
+    assert np.allclose(popt, expected_popt, rtol=1e-3, atol=1e-6)
+    assert np.allclose(pcov, expected_pcov, rtol=1e-2, atol=1e-12)
+
+    # Weights act as curve_fit's sigma = 1/sqrt(weight)
+    popt = app.linear_fit(fx, x_data, y_data, weights)[0]
+    expected_popt = optimize.curve_fit(app.model_functions[fx], x_data, y_data, p0=np.ones(len(params)), sigma=1/np.sqrt(weights))[0]
+
+    assert np.allclose(popt, expected_popt, rtol=1e-3, atol=1e-6)
+
+def test_linear_fit_rejects_too_few_points():
+
+    with pytest.raises(TypeError):
+        app.linear_fit('cubic', [1.0, 2.0, 3.0], [1.0, 8.0, 27.0])
+
+def piecewise_data(fx, rng):
+
+    x_data = rng.uniform(0, 10, 400)
+    if fx == 'piecewise_2':
+        (y0, m0, m1, brk) = (1.0, 2.0, -1.0, 4.0)
+        params = [y0, y0 + m0*brk, m0, m1, brk]
+    else:
+        (y0, b0, b1, b2, x0, x1) = (1.0, 2.0, -1.0, 0.5, 3.0, 7.0)
+        y1 = y0 + b0*x0 + b1*(x1 - x0)
+        params = [y0, y1, b0, b1, b2, x0, x1]
+
+    y_data = app.model_functions[fx](x_data, *params) + rng.normal(0, 0.1, 400)
+
+    return x_data, y_data, np.array(params)
+
+# curve_fit can't estimate a covariance through the flat derivative of a breakpoint, only its parameters are compared
+@pytest.mark.filterwarnings('ignore::scipy.optimize.OptimizeWarning')
+@pytest.mark.parametrize('fx', ['piecewise_2', 'piecewise_3'])
+def test_segmented_fit_recovers_the_breakpoints(fx):
+
+    (x_data, y_data, params) = piecewise_data(fx, np.random.RandomState(3))
+    breaks = app.piecewise_models[fx]
+
+    (popt, pcov) = app.segmented_fit(fx, x_data, y_data)
+
+    # The last parameters of both models are the breakpoints
+    assert np.allclose(popt[-breaks:], params[-breaks:], atol=0.1)
+    assert np.allclose(popt[:-breaks], params[:-breaks], atol=0.1)
+    assert pcov.shape == (len(params), len(params))
+    assert np.all(np.isfinite(np.diag(pcov))) and np.all(np.diag(pcov) > 0)
+
+    # curve_fit started next to the true parameters is the best it can do, the search must fit at least as well
+    expected_popt = optimize.curve_fit(app.model_functions[fx], x_data, y_data, p0=params*1.05)[0]
+    residual = np.sum((y_data - app.model_functions[fx](x_data, *popt))**2)
+    expected_residual = np.sum((y_data - app.model_functions[fx](x_data, *expected_popt))**2)
+
+    assert residual <= expected_residual*(1 + 1e-6)
+
+def test_segmented_fit_rejects_too_few_points():
+
+    with pytest.raises(TypeError):
+        app.segmented_fit('piecewise_3', np.arange(5.0), np.arange(5.0))
+
+def test_breakpoints_are_placed_inside_gaps_in_the_data():
+
+    # No data between x = 3 and x = 5, the lines meet at x = 4
+    x_data = np.concatenate([np.linspace(0, 3, 30), np.linspace(5, 10, 50)])
+    y_data = np.where(x_data < 4, 2*x_data, 8 - (x_data - 4))
+
+    popt = app.segmented_fit('piecewise_2', x_data, y_data)[0]
+
+    assert np.isclose(popt[-1], 4)
+    assert np.allclose(app.piecewise_2(x_data, *popt), y_data)
+
+def test_only_numerical_band_errors_are_caught(monkeypatch):
+
+    dataset = app.dataset_store.view(app.dataset_store.get(app.example['key']), 0, 1)
+    monkeypatch.setattr(app, 'fit_cache', app.LRUCache(app.fit_cache_bytes))
+    bounds = ([dataset['x_min'], dataset['x_max']], [dataset['y_min'], dataset['y_max']])
+
+    def singular(*args):
+        raise np.linalg.LinAlgError('SVD did not converge')
+
+    monkeypatch.setattr(app, 'fit_bands', singular)
+    assert app.cached_fit(dataset, 'linear', *bounds, bands='analytic')['bands'] is None
+
+    def broken(*args):
+        raise KeyError('model')
+
+    monkeypatch.setattr(app, 'fit_bands', broken)
+    with pytest.raises(KeyError):
+        app.cached_fit(dataset, 'linear', *bounds, bands='bootstrap')